@@ -0,0 +1,160 @@
+# _numba.py
+import numpy as np
+from numba import njit
+
+# Explicit signatures make numba compile eagerly at import (and cache to
+# __pycache__), so the first check in the UI doesn't pay for the JIT.
+# Callers must pass writable float64 arrays (see indicators._f64).
+#
+# The *_tail kernels keep only running state and return the last k values;
+# the full-series kernels are the k = len(x) case.
+#
+# No fastmath: NaN bars are expected (missing provider data) and RSI writes
+# NaN on purpose, so LLVM must not assume NaN-free math.
+
+@njit(cache=True)
+def _ewm_step(weighted, old_wt, x, alpha):
+    """
+    One step of pandas ewm(alpha=alpha, adjust=False).mean() (ignore_na=False),
+    returning the new (weighted, old_wt). A NaN x holds the value but still
+    decays old_wt, so the next real value gets more weight - same as pandas.
+    Leading NaNs stay NaN until the first real value.
+    """
+    if weighted != weighted:
+        if x == x:
+            return x, 1.0
+        return weighted, old_wt
+    old_wt *= 1.0 - alpha
+    if x == x:
+        if weighted != x:
+            weighted = (old_wt * weighted + alpha * x) / (old_wt + alpha)
+        old_wt = 1.0
+    return weighted, old_wt
+
+@njit("float64[:](float64[:], float64, int64)", cache=True)
+def ewma_tail(x, alpha, k):
+    """
+    Last k values of ewma_alpha(x, alpha), without storing the full series.
+    """
+    n = x.shape[0]
+    k = min(k, n)
+    out = np.empty(k, dtype=np.float64)
+    if n == 0:
+        return out
+    start = n - k
+    y = np.nan
+    old_wt = 1.0
+    for i in range(n):
+        y, old_wt = _ewm_step(y, old_wt, x[i], alpha)
+        if i >= start:
+            out[i - start] = y
+    return out
+
+@njit("float64[:](float64[:], float64)", cache=True)
+def ewma_alpha(x, alpha):
+    """
+    Recursive EWMA, same as pandas ewm(alpha=alpha, adjust=False).mean():
+    out[0] = x[0]; out[i] = alpha*x[i] + (1-alpha)*out[i-1] (NaNs as in _ewm_step)
+    """
+    return ewma_tail(x, alpha, x.shape[0])
+
+@njit("float64(float64, float64, float64)", cache=True)
+def ewma_update(prev_value, new_x, alpha):
+    """
+    Single ewma_alpha step, for extending an EWMA by one new bar
+    without re-running the whole series.
+    """
+    return alpha * new_x + (1.0 - alpha) * prev_value
+
+@njit("float64[:](float64[:], float64, int64)", cache=True)
+def rsi_tail(close, alpha, k):
+    """
+    Last k values of rsi_fused(close, alpha), without storing the full series.
+    """
+    n = close.shape[0]
+    k = min(k, n)
+    out = np.empty(k, dtype=np.float64)
+    if n == 0:
+        return out
+    start = n - k
+    if start == 0:
+        out[0] = np.nan
+    up = np.nan
+    down = np.nan
+    up_wt = 1.0
+    down_wt = 1.0
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if d == d:
+            u = d if d > 0.0 else 0.0
+            dn = -d if d < 0.0 else 0.0
+        else:
+            u = np.nan
+            dn = np.nan
+        up, up_wt = _ewm_step(up, up_wt, u, alpha)
+        down, down_wt = _ewm_step(down, down_wt, dn, alpha)
+        if i >= start:
+            if down > 0.0:
+                out[i - start] = 100.0 - 100.0 / (1.0 + up / down)
+            elif down == 0.0 and up > 0.0:
+                out[i - start] = 100.0
+            else:
+                out[i - start] = np.nan
+    return out
+
+@njit("float64[:](float64[:], float64)", cache=True)
+def rsi_fused(close, alpha):
+    """
+    RSI in one pass over close: the up/down EWMAs (as in ewma_alpha, seeded
+    with the first delta) are updated together and RSI is written directly.
+    First bar has no delta -> NaN; down == 0 gives 100 (NaN if up is 0 too).
+    A NaN close makes its deltas NaN, which the EWMAs skip as in _ewm_step.
+    """
+    return rsi_tail(close, alpha, close.shape[0])
+
+@njit("float64[:](float64[:], float64[:], float64[:], float64, int64)", cache=True)
+def true_range_ewma_tail(high, low, close, alpha, k):
+    """
+    Last k values of true_range_ewma(high, low, close, alpha), without
+    storing the full series.
+    """
+    n = close.shape[0]
+    k = min(k, n)
+    out = np.empty(k, dtype=np.float64)
+    if n == 0:
+        return out
+    start = n - k
+    y = np.nan
+    old_wt = 1.0
+    prev_close = np.nan
+    for i in range(n):
+        # NaN-skipping max, like the old pd.concat(...).max(axis=1)
+        tr = high[i] - low[i]
+        high_close = abs(high[i] - prev_close)
+        low_close = abs(low[i] - prev_close)
+        if high_close == high_close and (tr != tr or high_close > tr):
+            tr = high_close
+        if low_close == low_close and (tr != tr or low_close > tr):
+            tr = low_close
+        prev_close = close[i]
+        y, old_wt = _ewm_step(y, old_wt, tr, alpha)
+        if i >= start:
+            out[i - start] = y
+    return out
+
+@njit("float64[:](float64[:], float64[:], float64[:], float64)", cache=True)
+def true_range_ewma(high, low, close, alpha):
+    """
+    EWMA (as in ewma_alpha) of the true range, fused into one pass so the
+    true range series itself is never materialized.
+    True range: max(high-low, |high-prev_close|, |low-prev_close|); the first
+    bar has no previous close, so it is just high-low.
+    """
+    return true_range_ewma_tail(high, low, close, alpha, close.shape[0])
+
+# materialize the dispatchers (and load the disk cache) up front
+_dummy = np.zeros(2, dtype=np.float64)
+ewma_alpha(_dummy, 0.5)
+ewma_update(0.0, 0.0, 0.5)
+rsi_fused(_dummy, 0.5)
+true_range_ewma(_dummy, _dummy, _dummy, 0.5)
@@ -1,20 +1,24 @@
 # app.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import time
-import json
+import orjson
 import os
+import sqlite3
+import threading
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, Tuple
 
-from indicators import compute_all
-from telegram_alerts import send_telegram_message
+from indicators import compute_tail
+from telegram_alerts import MAX_WAIT_MS, build_session, queue_telegram_message
+from streamlit_autorefresh import st_autorefresh
 
 import requests
 
 # ---------- Config ----------
 CONFIG_FILE = "config.json"
-ALERTS_FILE = "alerts_sent.json"  # persists to avoid duplicate alerts
+ALERTS_DB = "alerts_sent.db"  # persists to avoid duplicate alerts
 
 st.set_page_config(page_title="Option Momentum Alert", layout="wide")
 
@@ -22,84 +26,162 @@ def load_config():
     if not os.path.exists(CONFIG_FILE):
         st.error(f"Create {CONFIG_FILE} with your Dhan/NSE and Telegram credentials. See README.")
         st.stop()
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+    with open(CONFIG_FILE, "rb") as f:
+        return orjson.loads(f.read())
 
 cfg = load_config()
 
+@st.cache_resource
+def get_http_session():
+    # one pooled keep-alive session for provider calls, shared across reruns
+    return build_session()
+
 # ---------- Helpers ----------
-def persist_alert(symbol, ts):
-    data = {}
-    if os.path.exists(ALERTS_FILE):
-        with open(ALERTS_FILE, "r") as f:
-            try:
-                data = json.load(f)
-            except:
-                data = {}
-    data[symbol] = ts
-    with open(ALERTS_FILE, "w") as f:
-        json.dump(data, f)
+@st.cache_resource
+def get_alerts_db():
+    # one connection shared by all sessions (each runs in its own thread); use under get_alerts_lock()
+    conn = sqlite3.connect(ALERTS_DB, check_same_thread=False)
+    conn.execute("CREATE TABLE IF NOT EXISTS alerts(symbol TEXT PRIMARY KEY, ts REAL)")
+    conn.commit()
+    return conn
+
+@st.cache_resource
+def get_alerts_lock():
+    return threading.Lock()
+
+_alerts_db = get_alerts_db()
+_alerts_lock = get_alerts_lock()
+
+def persist_alert(symbol):
+    with _alerts_lock:
+        _alerts_db.execute("INSERT OR REPLACE INTO alerts VALUES (?, ?)", (symbol, time.time()))
+        _alerts_db.commit()
 
 def was_alert_sent_recent(symbol, minutes=30):
-    if not os.path.exists(ALERTS_FILE):
-        return False
-    with open(ALERTS_FILE, "r") as f:
-        try:
-            data = json.load(f)
-        except:
-            return False
-    if symbol not in data:
-        return False
-    last_ts = datetime.fromisoformat(data[symbol])
-    diff = datetime.now(timezone.utc) - last_ts.replace(tzinfo=timezone.utc)
-    return diff.total_seconds() <= minutes * 60
+    # ts is epoch seconds, so the cooldown check is a float compare done by sqlite
+    cutoff = time.time() - minutes * 60
+    with _alerts_lock:
+        row = _alerts_db.execute("SELECT 1 FROM alerts WHERE symbol = ? AND ts >= ?", (symbol, cutoff)).fetchone()
+    return row is not None
+
+def recent_alerts() -> Dict[str, str]:
+    # symbol -> ISO timestamp (UTC), for display
+    with _alerts_lock:
+        rows = _alerts_db.execute("SELECT symbol, ts FROM alerts ORDER BY ts DESC").fetchall()
+    return {symbol: datetime.fromtimestamp(ts, timezone.utc).isoformat() for symbol, ts in rows}
 
 # ---------- Data fetch (placeholder) ----------
-def fetch_candles(symbol: str, interval="5m", limit=200) -> pd.DataFrame:
+BAR_SECONDS = 300  # 5m bars
+
+def current_bar_bucket() -> int:
+    # changes once per bar, so cached candles are refetched when a new bar starts
+    return int(time.time() // BAR_SECONDS)
+
+@st.cache_data(ttl=60, max_entries=256)
+def fetch_candles(symbol: str, interval="5m", limit=200, bar_bucket=None) -> pd.DataFrame:
     """
     Fetch OHLCV candles for the option symbol.
+    Cached per (symbol, interval, limit, bar_bucket); pass current_bar_bucket()
+    so mid-bar reruns reuse the last fetch.
     Replace with your real data provider code (Dhan / NSE API / broker feed).
     Return DataFrame with columns: ['open','high','low','close','volume'] sorted oldest -> newest.
     """
     # Example: Dhan historical candles (pseudocode) - replace below
     # endpoint = f"https://api.dhan.co/exchange/v1/ohlc?symbol={symbol}&interval={interval}&limit={limit}"
     # headers = {"Authorization": f"Bearer {cfg['dhan_token']}"}
-    # r = requests.get(endpoint, headers=headers, timeout=10).json()
+    # r = orjson.loads(get_http_session().get(endpoint, headers=headers, timeout=10).content)
     # parse r into DataFrame...
     #
     # === For demo / if you don't have API, raise with helpful message ===
     if cfg.get("demo_mode", False):
         # demo: create synthetic data for UI testing
-        idx = pd.date_range(end=pd.Timestamp.now(), periods=limit, freq="5T")
-        import numpy as np
-        price = 100 + np.cumsum(np.random.randn(limit).cumsum() * 0.1)
-        df = pd.DataFrame({
-            "open": price,
-            "high": price + np.random.rand(limit) * 1.5,
-            "low": price - np.random.rand(limit) * 1.5,
-            "close": price + (np.random.rand(limit)-0.5),
-            "volume": (np.random.rand(limit) * 50 + 10).astype(int)
-        }, index=idx)
+        idx = pd.date_range(end=pd.Timestamp.now(), periods=limit, freq="5min")
+        rng = np.random.default_rng()
+        price = 100 + (rng.standard_normal(limit) * 0.1).cumsum()
+        # fill one (limit, 5) block so the frame is a single contiguous array
+        arr = np.empty((limit, 5), dtype=np.float64)
+        arr[:, 0] = price
+        arr[:, 1] = price + rng.random(limit) * 1.5
+        arr[:, 2] = price - rng.random(limit) * 1.5
+        arr[:, 3] = price + (rng.random(limit) - 0.5)
+        arr[:, 4] = np.floor(rng.random(limit) * 50 + 10)  # volume kept float, indicators don't need int
+        df = pd.DataFrame(arr, columns=["open", "high", "low", "close", "volume"], index=idx, copy=False)
         return df
     raise RuntimeError("fetch_candles: You must implement the data fetch logic for your provider. Set demo_mode true in config.json to test UI.")
 
+@st.cache_data(ttl=60, max_entries=256)
+def fetch_candles_batch(symbols, interval="5m", limit=200, bar_bucket=None) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch OHLCV candles for many symbols in a single provider round-trip.
+    Returns {symbol: DataFrame} in the same format as fetch_candles; symbols
+    the provider returned nothing for are left out. Cached like fetch_candles.
+    """
+    # Example: Dhan bulk OHLC (pseudocode) - replace below
+    # endpoint = "https://api.dhan.co/exchange/v1/ohlc/bulk"
+    # headers = {"Authorization": f"Bearer {cfg['dhan_token']}"}
+    # body = {"symbols": list(symbols), "interval": interval, "limit": limit}
+    # r = orjson.loads(get_http_session().post(endpoint, data=orjson.dumps(body), headers={**headers, "Content-Type": "application/json"}, timeout=10).content)
+    # return {sym: pd.DataFrame(rows, columns=['open','high','low','close','volume']) for sym, rows in r.items()}
+    #
+    if cfg.get("demo_mode", False):
+        return {symbol: fetch_candles(symbol, interval=interval, limit=limit, bar_bucket=bar_bucket) for symbol in symbols}
+    raise RuntimeError("fetch_candles_batch: You must implement the bulk fetch logic for your provider. Set demo_mode true in config.json to test UI.")
+
 # ---------- Signal logic ----------
-def detect_momentum_signal(df: pd.DataFrame) -> Dict:
+# symbol -> ((last bar timestamp, bar count, last row values), compute_tail result);
+# kept in session_state so it survives reruns
+if "indicator_cache" not in st.session_state:
+    st.session_state["indicator_cache"] = {}
+_indicator_cache: Dict[str, Tuple[Tuple[pd.Timestamp, int, Tuple], Dict]] = st.session_state["indicator_cache"]
+
+def compute_tail_cached(symbol: str, df: pd.DataFrame) -> Dict:
+    """
+    compute_tail, but reuse the last result for this symbol while the data is
+    unchanged. The key includes the last row's values, so a forming bar whose
+    close/volume moved (same timestamp) is recomputed.
+    """
+    key = (df.index[-1], len(df), tuple(df.iloc[-1].tolist()))
+    cached = _indicator_cache.get(symbol)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    out = compute_tail(df)
+    _indicator_cache[symbol] = (key, out)
+    return out
+
+# optional cheap pre-check (config "prefilter_near_high": true): skip indicators
+# when the last close is more than 1% below the recent high. This is a heuristic,
+# not a bound - it can suppress real signals (close still above both EMAs, or
+# right after an EMA cross), so it is off by default.
+PREFILTER_LOOKBACK = 21
+PREFILTER_RATIO = 0.99
+
+def detect_momentum_signal(df: pd.DataFrame, symbol: str = None) -> Dict:
     """
     Return a dict with signal info if last bar satisfies momentum breakout.
+    Pass symbol to reuse cached indicators when the last bar is unchanged.
     """
     if df is None or len(df) < 30:
         return {}
-    df = compute_all(df)
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    close = df['close'].to_numpy(dtype=np.float64)
+    if cfg.get("prefilter_near_high", False) and close[-1] < PREFILTER_RATIO * close[-PREFILTER_LOOKBACK - 1:-1].max():
+        return {
+            "signal": False,
+            "ema_cross": False,
+            "rsi5": float("nan"),
+            "vol_spike": False,
+            "atr_spike": False,
+            "close": float(close[-1]),
+            "time": str(df.index[-1])
+        }
+    # only the last two bars' indicator values, as scalars
+    ind = compute_tail_cached(symbol, df) if symbol else compute_tail(df)
 
     # Conditions per our design
-    ema_cross = last['ema9'] > last['ema21'] and prev['ema9'] <= prev['ema21']
-    rsi_burst = last['rsi5'] > 55
-    vol_spike = last['vol_spike'] == True
-    atr_spike = last['atr_spike'] == True
-    price_above_emas = last['close'] > last['ema9'] and last['close'] > last['ema21']
+    ema_cross = ind['ema9_last'] > ind['ema21_last'] and ind['ema9_prev'] <= ind['ema21_prev']
+    rsi_burst = ind['rsi5_last'] > 55
+    vol_spike = ind['vol_spike_last']
+    atr_spike = ind['atr_spike_last']
+    price_above_emas = ind['close_last'] > ind['ema9_last'] and ind['close_last'] > ind['ema21_last']
 
     # final boolean
     signal = (ema_cross or price_above_emas) and rsi_burst and vol_spike and atr_spike
@@ -107,11 +189,11 @@ def detect_momentum_signal(df: pd.DataFrame) -> Dict:
     return {
         "signal": bool(signal),
         "ema_cross": bool(ema_cross),
-        "rsi5": float(last['rsi5']),
-        "vol_spike": bool(vol_spike),
-        "atr_spike": bool(atr_spike),
-        "close": float(last['close']),
-        "time": str(last.name)
+        "rsi5": float(ind['rsi5_last']),
+        "vol_spike": vol_spike,
+        "atr_spike": atr_spike,
+        "close": float(ind['close_last']),
+        "time": str(df.index[-1])
     }
 
 # ---------- Streamlit UI ----------
@@ -131,17 +213,24 @@ with col2:
     st.header("Live Results")
     placeholder = st.empty()
 
-symbols = [s.strip() for s in symbols_text.splitlines() if s.strip()]
+# deduped (order kept): alerts are only persisted once the batched sends
+# finish, so a repeated symbol would pass the cooldown check twice
+symbols = list(dict.fromkeys(s.strip() for s in symbols_text.splitlines() if s.strip()))
 
 def run_check():
+    try:
+        candles = fetch_candles_batch(symbols, interval="5m", limit=200, bar_bucket=current_bar_bucket())
+    except Exception as e:
+        return [{"symbol": symbol, "error": str(e)} for symbol in symbols]
+
     results = []
+    pending = []  # (symbol, Future) for queued telegram alerts
     for symbol in symbols:
-        try:
-            df = fetch_candles(symbol, interval="5m", limit=200)
-        except Exception as e:
-            results.append({"symbol": symbol, "error": str(e)})
+        df = candles.get(symbol)
+        if df is None:
+            results.append({"symbol": symbol, "error": "no candles returned"})
             continue
-        sig = detect_momentum_signal(df)
+        sig = detect_momentum_signal(df, symbol)
         sig["symbol"] = symbol
         results.append(sig)
 
@@ -156,18 +245,31 @@ def run_check():
                     f"RSI5: {sig['rsi5']:.1f} | EMA9>EMA21: {sig['ema_cross']}\n"
                     f"Vol Spike: {sig['vol_spike']} | ATR Spike: {sig['atr_spike']}\n"
                 )
-                sent = False
                 try:
-                    sent = send_telegram_message(cfg.get("telegram_bot_token"), cfg.get("telegram_chat_id"), msg)
+                    pending.append((symbol, queue_telegram_message(cfg.get("telegram_bot_token"), cfg.get("telegram_chat_id"), msg)))
                 except Exception as e:
-                    sent = False
                     st.error(f"Telegram send error for {symbol}: {e}")
-                if sent:
-                    persist_alert(symbol, datetime.now(timezone.utc).isoformat())
             else:
                 # already alerted recently
                 pass
 
+    # alerts go out in batches; only persist the ones that were delivered.
+    # Bounded wait (one batch window + send time) so a dead sender thread
+    # can't hang the script; a timeout counts as not sent.
+    deadline = time.monotonic() + MAX_WAIT_MS / 1000 + 15
+    for symbol, fut in pending:
+        sent = False
+        try:
+            sent = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            sent = False
+            st.error(f"Telegram send timed out for {symbol}")
+        except Exception as e:
+            sent = False
+            st.error(f"Telegram send error for {symbol}: {e}")
+        if sent:
+            persist_alert(symbol)
+
     return results
 
 if run_button:
@@ -177,20 +279,22 @@ if run_button:
         st.success("Check completed.")
 
 if autorefresh:
-    st_autorefresh = st.experimental_get_query_params()  # just to use an experimental rerun
-    # Streamlit's recommended simple autorefresh:
-    count = st.experimental_get_query_params().get("count", [0])
-    # Simpler — provide Run Now to quickly trigger; the user can refresh the page or deploy scheduled runner externally.
+    # the component triggers a rerun every 60s and returns how many times it has fired;
+    # only check when that count moves, not on reruns from other widgets
+    # (the count is recorded even when Run Check Now already ran this rerun,
+    # so the same rerun never checks twice)
+    count = st_autorefresh(interval=60_000, limit=None, key="momentum_refresh")
+    if count != st.session_state.get("autorefresh_count"):
+        st.session_state["autorefresh_count"] = count
+        if not run_button:
+            results = run_check()
+            placeholder.dataframe(pd.DataFrame(results))
 
 # show last alerts
-if os.path.exists(ALERTS_FILE):
-    with open(ALERTS_FILE, "r") as f:
-        try:
-            alerts = json.load(f)
-            st.subheader("Recent Alerts (symbol -> timestamp)")
-            st.json(alerts)
-        except:
-            st.write("No alerts recorded yet.")
+alerts = recent_alerts()
+if alerts:
+    st.subheader("Recent Alerts (symbol -> timestamp)")
+    st.json(alerts)
 else:
     st.write("No alerts recorded yet.")
 
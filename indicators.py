@@ -2,43 +2,134 @@
 import pandas as pd
 import numpy as np
 
+from _numba import ewma_alpha, ewma_tail, rsi_fused, rsi_tail, true_range_ewma, true_range_ewma_tail
+
+try:
+    import bottleneck as bn
+except ImportError:  # optional, falls back to np.convolve
+    bn = None
+
+# indicator parameters, shared by compute_all and compute_tail
+# (column / key names like ema9 and atr14 refer to the defaults)
+EMA_FAST = 9
+EMA_SLOW = 21
+RSI_LENGTH = 5
+ATR_LENGTH = 14
+ATR_MA_WINDOW = 14
+ATR_SPIKE_MULTIPLIER = 1.2
+VOL_LOOKBACK = 10
+VOL_SPIKE_MULTIPLIER = 1.5
+
+def _ema_alpha(length: int) -> float:
+    return 2 / (length + 1)
+
+def _wilder_alpha(length: int) -> float:
+    return 1 / length
+
+def _f64(values) -> np.ndarray:
+    # the numba kernels only take writable float64 arrays; copy-on-write pandas
+    # (default in pandas 3) and np.frombuffer-parsed data give read-only ones
+    arr = np.asarray(values, dtype=np.float64)
+    return arr if arr.flags.writeable else arr.copy()
+
+# ndarray versions; the pd.Series wrappers below are for standalone use
+def _ema_values(close: np.ndarray, length: int) -> np.ndarray:
+    return ewma_alpha(close, _ema_alpha(length))
+
+def _rsi_values(close: np.ndarray, length: int) -> np.ndarray:
+    return rsi_fused(close, _wilder_alpha(length))
+
+def _atr_values(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    return true_range_ewma(high, low, close, _wilder_alpha(length))
+
 def ema(series: pd.Series, length: int):
-    return series.ewm(span=length, adjust=False).mean()
-
-def rsi(series: pd.Series, length: int = 5):
-    delta = series.diff()
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    ma_up = up.ewm(alpha=1/length, adjust=False).mean()
-    ma_down = down.ewm(alpha=1/length, adjust=False).mean()
-    rs = ma_up / ma_down
-    return 100 - (100 / (1 + rs))
-
-def atr(df: pd.DataFrame, length: int = 14):
+    return pd.Series(_ema_values(_f64(series), length), index=series.index)
+
+def rsi(series: pd.Series, length: int = RSI_LENGTH):
+    return pd.Series(_rsi_values(_f64(series), length), index=series.index)
+
+def atr(df: pd.DataFrame, length: int = ATR_LENGTH):
     # df must contain columns: high, low, close
-    high_low = df['high'] - df['low']
-    high_close = (df['high'] - df['close'].shift()).abs()
-    low_close = (df['low'] - df['close'].shift()).abs()
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    return tr.ewm(alpha=1/length, adjust=False).mean()
+    values = _atr_values(
+        _f64(df['high']),
+        _f64(df['low']),
+        _f64(df['close']),
+        length,
+    )
+    return pd.Series(values, index=df.index)
 
-def volume_spike(volume_series: pd.Series, lookback: int = 10, multiplier: float = 1.5):
-    baseline = volume_series.rolling(lookback).mean()
-    return volume_series > baseline * multiplier
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing mean over `window` bars, NaN until the window is full, like
+    pd.Series.rolling(window).mean(). Summation order differs from pandas,
+    so values can differ in the last bits (and a compare against an exact
+    boundary can flip).
+    """
+    if values.shape[0] < window:
+        return np.full(values.shape[0], np.nan)
+    if bn is not None:
+        return bn.move_mean(values, window, min_count=window)
+    out = np.convolve(values, np.ones(window) / window, mode='full')[:values.shape[0]]
+    out[:window - 1] = np.nan
+    return out
+
+def volume_spike(volume, lookback: int = VOL_LOOKBACK, multiplier: float = VOL_SPIKE_MULTIPLIER) -> np.ndarray:
+    """
+    Bool ndarray: volume above `multiplier` x its trailing `lookback` mean.
+    """
+    volume = np.asarray(volume, dtype=np.float64)
+    baseline = rolling_mean(volume, lookback)
+    return volume > baseline * multiplier
 
 def compute_all(df: pd.DataFrame):
     """
     Expect df indexed in chronological order (old -> new) with columns:
     ['open','high','low','close','volume']
-    Returns df with indicators appended.
-    """
-    df = df.copy()
-    df['ema9'] = ema(df['close'], 9)
-    df['ema21'] = ema(df['close'], 21)
-    df['rsi5'] = rsi(df['close'], 5)
-    df['atr14'] = atr(df, 14)
-    df['atr14_ma'] = df['atr14'].rolling(14).mean()
-    df['atr_spike'] = df['atr14'] > df['atr14_ma'] * 1.2
-    df['vol_spike'] = volume_spike(df['volume'], lookback=10, multiplier=1.5)
-    return df
+    Returns a new df with indicators appended (input is left untouched).
+    """
+    high = _f64(df['high'])
+    low = _f64(df['low'])
+    close = _f64(df['close'])
+    atr14 = _atr_values(high, low, close, ATR_LENGTH)
+    atr14_ma = rolling_mean(atr14, ATR_MA_WINDOW)
+    # one assign -> indicator columns are added in a single step, no copy + 7 inserts
+    return df.assign(
+        ema9=_ema_values(close, EMA_FAST),
+        ema21=_ema_values(close, EMA_SLOW),
+        rsi5=_rsi_values(close, RSI_LENGTH),
+        atr14=atr14,
+        atr14_ma=atr14_ma,
+        atr_spike=atr14 > atr14_ma * ATR_SPIKE_MULTIPLIER,
+        vol_spike=volume_spike(_f64(df['volume']), lookback=VOL_LOOKBACK, multiplier=VOL_SPIKE_MULTIPLIER),
+    )
 
+def compute_tail(df: pd.DataFrame) -> dict:
+    """
+    Same indicators as compute_all, but only the scalars a last-bar signal
+    check needs (no full-length columns are built):
+    ema9/ema21 for the last and previous bar, and the last bar's rsi5,
+    atr14, atr14_ma, atr_spike, vol_spike and close. Needs at least 2 bars.
+    """
+    high = _f64(df['high'])
+    low = _f64(df['low'])
+    close = _f64(df['close'])
+    volume = _f64(df['volume'])
+    ema9 = ewma_tail(close, _ema_alpha(EMA_FAST), 2)
+    ema21 = ewma_tail(close, _ema_alpha(EMA_SLOW), 2)
+    rsi5 = rsi_tail(close, _wilder_alpha(RSI_LENGTH), 1)
+    # rolling means include the last bar, so only the last window is needed
+    atr14 = true_range_ewma_tail(high, low, close, _wilder_alpha(ATR_LENGTH), ATR_MA_WINDOW)
+    atr14_ma = atr14.mean() if atr14.shape[0] == ATR_MA_WINDOW else np.nan
+    vol_baseline = volume[-VOL_LOOKBACK:].mean() if volume.shape[0] >= VOL_LOOKBACK else np.nan
+    return {
+        "ema9_last": ema9[-1],
+        "ema9_prev": ema9[-2],
+        "ema21_last": ema21[-1],
+        "ema21_prev": ema21[-2],
+        "rsi5_last": rsi5[-1],
+        "atr14_last": atr14[-1],
+        "atr14_ma_last": atr14_ma,
+        "atr_spike_last": bool(atr14[-1] > atr14_ma * ATR_SPIKE_MULTIPLIER),
+        "vol_spike_last": bool(volume[-1] > vol_baseline * VOL_SPIKE_MULTIPLIER),
+        "close_last": close[-1],
+    }
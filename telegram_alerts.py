@@ -1,6 +1,35 @@
 # telegram_alerts.py
+import orjson
 import requests
 import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BATCH_MAX = 20        # flush once this many messages are queued
+MAX_WAIT_MS = 500     # ...or once the oldest queued message is this old
+TELEGRAM_MAX_CHARS = 4096
+
+def build_session() -> requests.Session:
+    """
+    Keep-alive session with a connection pool and a short retry on
+    rate-limit / server errors, so repeated calls skip the TCP+TLS handshake.
+    Only idempotent requests (GET) are retried: a retried sendMessage POST
+    could deliver the same alert twice.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET"]),
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry))
+    return session
+
+_SESSION = build_session()
 
 def send_telegram_message(bot_token: str, chat_id: str, text: str):
     """
@@ -15,7 +44,7 @@ def send_telegram_message(bot_token: str, chat_id: str, text: str):
         "parse_mode": "HTML"
     }
     try:
-        r = requests.post(url, json=payload, timeout=10)
+        r = _SESSION.post(url, data=orjson.dumps(payload), headers={"Content-Type": "application/json"}, timeout=10)
         if r.status_code == 200:
             return True
         else:
@@ -26,3 +55,83 @@ def send_telegram_message(bot_token: str, chat_id: str, text: str):
         print("Telegram send error:", e)
         return False
 
+class BatchSender:
+    """
+    Queues messages and sends them from a background thread in batches.
+    A batch is flushed when BATCH_MAX messages are waiting or the first one
+    has waited MAX_WAIT_MS. Messages for the same chat are joined into as few
+    Telegram messages as fit in TELEGRAM_MAX_CHARS.
+    """
+    def __init__(self, bot_token: str, batch_max: int = BATCH_MAX, max_wait_ms: int = MAX_WAIT_MS):
+        self.bot_token = bot_token
+        self.batch_max = batch_max
+        self.max_wait = max_wait_ms / 1000
+        self._queue = deque()
+        self._first_enqueue = 0.0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="telegram-batch", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, chat_id: str, text: str) -> Future:
+        """
+        Queue a message and return immediately. The Future resolves to
+        True/False once the batch containing it has been sent.
+        """
+        fut = Future()
+        with self._cond:
+            if not self._queue:
+                self._first_enqueue = time.monotonic()
+            self._queue.append((chat_id, text, fut))
+            self._cond.notify()
+        return fut
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                while len(self._queue) < self.batch_max:
+                    remaining = self._first_enqueue + self.max_wait - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = list(self._queue)
+                self._queue.clear()
+            self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        # chat_id -> list of [text, [futures]] chunks, each within the size limit
+        chunks = {}
+        for chat_id, text, fut in batch:
+            parts = chunks.setdefault(chat_id, [])
+            if parts and len(parts[-1][0]) + 2 + len(text) <= TELEGRAM_MAX_CHARS:
+                parts[-1][0] += "\n\n" + text
+                parts[-1][1].append(fut)
+            else:
+                parts.append([text, [fut]])
+        for chat_id, parts in chunks.items():
+            for text, futs in parts:
+                try:
+                    sent = send_telegram_message(self.bot_token, chat_id, text)
+                except Exception as e:
+                    for fut in futs:
+                        fut.set_exception(e)
+                    continue
+                for fut in futs:
+                    fut.set_result(sent)
+
+_senders = {}
+_senders_lock = threading.Lock()
+
+def queue_telegram_message(bot_token: str, chat_id: str, text: str) -> Future:
+    """
+    Non-blocking send through a shared BatchSender for this bot token.
+    Returns a Future resolving to True if sent, False otherwise.
+    """
+    if not bot_token or not chat_id:
+        raise ValueError("Provide bot_token and chat_id in config.")
+    with _senders_lock:
+        sender = _senders.get(bot_token)
+        if sender is None:
+            sender = _senders[bot_token] = BatchSender(bot_token)
+    return sender.enqueue(chat_id, text)